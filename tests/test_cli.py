@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the `trampolino.cli` workflow setup."""
+
+import os
+import shutil
+import time
+
+import pytest
+from nipype import config
+import nipype.pipeline.engine as pe
+from nipype.interfaces.base import (SimpleInterface, BaseInterfaceInputSpec,
+                                    TraitedSpec, File)
+
+from trampolino import cli
+
+
+class StampOutputSpec(TraitedSpec):
+    out_file = File(exists=True)
+
+
+class Stamp(SimpleInterface):
+    """Writes the current time to a file."""
+    input_spec = BaseInterfaceInputSpec
+    output_spec = StampOutputSpec
+
+    def _run_interface(self, runtime):
+        with open('stamp.txt', 'w') as f:
+            f.write(repr(time.time()))
+        self._results['out_file'] = os.path.abspath('stamp.txt')
+        return runtime
+
+
+@pytest.fixture
+def nipype_config():
+    """Restores the global nipype execution settings changed by the CLI."""
+    saved = dict(config._sections['execution'])
+    yield
+    config._sections['execution'] = saved
+
+
+def run_stamp(working_dir):
+    ctx = cli.cli.make_context('trampolino',
+                               ['-w', str(working_dir), 'recon', 'none'])
+    with ctx:
+        ctx.invoke(cli.cli.callback, **ctx.params)
+        wf = cli.get_workflow(ctx)
+        wf.add_nodes([pe.Node(Stamp(), name='stamp')])
+        execgraph = wf.run()
+    return list(execgraph.nodes())[0].result.outputs.out_file
+
+
+def test_cache_survives_moved_working_dir(tmp_path, nipype_config):
+    """Cached results are reused after moving the working directory."""
+    first = tmp_path / 'first'
+    second = tmp_path / 'second'
+    first.mkdir()
+    out_file = run_stamp(first)
+    with open(out_file) as f:
+        stamp = f.read()
+    shutil.move(str(first), str(second))
+    out_file = run_stamp(second)
+    assert out_file.startswith(str(second))
+    with open(out_file) as f:
+        assert f.read() == stamp
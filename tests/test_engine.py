@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `trampolino.engine`."""
+
+import nipype.pipeline.engine as pe
+from nipype.interfaces import utility as util
+
+from trampolino.engine import CachedWorkflow
+
+
+def build(wf_class):
+    """Connects a node to the output of a nested workflow."""
+    inner = pe.Workflow(name='inner')
+    a = pe.Node(util.IdentityInterface(fields=['x']), name='a')
+    b = pe.Node(util.IdentityInterface(fields=['x']), name='b')
+    inner.connect(a, 'x', b, 'x')
+    c = pe.Node(util.IdentityInterface(fields=['x']), name='c')
+    d = pe.Node(util.IdentityInterface(fields=['x']), name='d')
+    outer = wf_class(name='outer')
+    outer.connect([(inner, c, [('b.x', 'x')])])
+    return outer, inner, [a, b, c, d]
+
+
+def test_has_node_matches_workflow():
+    """Membership agrees with the stock workflow, nested nodes included."""
+    cached, cached_inner, cached_nodes = build(CachedWorkflow)
+    stock, stock_inner, stock_nodes = build(pe.Workflow)
+    assert cached._has_node(cached_inner) == stock._has_node(stock_inner)
+    for cn, sn in zip(cached_nodes, stock_nodes):
+        assert cached._has_node(cn) == stock._has_node(sn)
+    assert [cached._has_node(n) for n in cached_nodes] == [True, True, True, False]
+
+
+def test_has_node_after_removal():
+    """Removed nested workflows are no longer searched."""
+    outer, inner, (a, b, c, d) = build(CachedWorkflow)
+    outer.remove_nodes([inner])
+    assert not outer._has_node(a)
+    assert not outer._has_node(inner)
+
+    outer, inner, (a, b, c, d) = build(CachedWorkflow)
+    outer._graph.remove_node(inner)
+    assert not outer._has_node(a)
+    assert outer._has_node(c)
+
+
+def test_flat_graph():
+    """Flattening matches the stock workflow and leaves no stale entries."""
+    cached = build(CachedWorkflow)[0]
+    stock = build(pe.Workflow)[0]
+    cached_flat = cached._create_flat_graph()
+    stock_flat = stock._create_flat_graph()
+    assert sorted(n.fullname for n in cached_flat.nodes()) == \
+        sorted(n.fullname for n in stock_flat.nodes())
+    assert not any(isinstance(n, pe.Workflow) for n in cached_flat.nodes())
+
+    outer, inner, (a, b, c, d) = build(CachedWorkflow)
+    outer._generate_flatgraph()
+    assert not outer._has_node(inner)
+    assert outer._has_node(a) and outer._has_node(b) and outer._has_node(c)
+    assert not outer._has_node(d)
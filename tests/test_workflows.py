@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the `trampolino.workflows` pipelines."""
+
+from trampolino import cli
+from trampolino.workflows import mrtrix_tckedit
+
+
+def test_tckedit_length_options(tmp_path):
+    """The length criteria from --opt reach the tckedit command line."""
+    tck = tmp_path / 'tracked.tck'
+    tck.write_text(u'')
+    wf = mrtrix_tckedit.create_pipeline(opt='min_length:20,max_length:250')
+    edit = wf.get_node('edit')
+    edit.inputs.in_files = [str(tck)]
+    cmdline = edit.interface.cmdline
+    assert '-minlength 20' in cmdline
+    assert '-maxlength 250' in cmdline
+
+
+def test_filter_without_odf(tmp_path):
+    """The filter step does not require an ODF for mrtrix_tckedit."""
+    tck = tmp_path / 'tracked.tck'
+    tck.write_text(u'')
+    ctx = cli.cli.make_context('trampolino', ['-w', str(tmp_path),
+                                              'filter', 'mrtrix_tckedit'])
+    with ctx:
+        ctx.invoke(cli.cli.callback, **ctx.params)
+        ctx.invoke(cli.tck_filter, workflow='mrtrix_tckedit',
+                   tck=str(tck), odf=None, opt=None)
+        wf_sub = ctx.obj['workflow'].get_node('tck_post')
+        assert wf_sub.inputs.inputnode.tck == str(tck)
@@ -3,11 +3,9 @@
 """Console script for trampolino."""
 import sys
 import os.path
+import multiprocessing
 import click
 from importlib import import_module
-import nipype.pipeline.engine as pe
-from nipype.interfaces import utility as util
-from nipype.interfaces.io import DataSink
 
 
 @click.group(chain=True)
@@ -15,8 +13,22 @@ from nipype.interfaces.io import DataSink
               help='Working directory.')
 @click.option('-n', '--name', type=str, help='Experiment name.')
 @click.option('-r', '--results', type=str, help='Results directory.')
+@click.option('-p', '--plugin',
+              type=click.Choice(['Linear', 'MultiProc', 'SLURM', 'SGE']),
+              default='MultiProc', help='Nipype execution plugin.')
+@click.option('--n_procs', type=int, default=multiprocessing.cpu_count(),
+              help='Number of processes for the MultiProc plugin.')
+@click.option('--mem_gb', type=float,
+              help='Memory available for the MultiProc plugin (GB).')
+@click.option('--plugin_args', type=str,
+              help='Extra sbatch (SLURM) or qsub (SGE) arguments, '
+                   'e.g. "--partition=short --time=02:00:00".')
+@click.option('--nthreads', type=int,
+              help='Threads for each MRtrix3 command (default: n_procs '
+                   'with Linear or MultiProc, 1 with SLURM or SGE).')
 @click.pass_context
-def cli(ctx, working_dir, name, results):
+def cli(ctx, working_dir, name, results, plugin, n_procs, mem_gb,
+        plugin_args, nthreads):
     if not ctx.obj:
         ctx.obj = {}
     if not working_dir:
@@ -27,15 +39,75 @@ def cli(ctx, working_dir, name, results):
         ctx.obj['output'] = 'trampolino'
     else:
         ctx.obj['output'] = results
-    datasink = pe.Node(DataSink(base_directory=ctx.obj['wdir'],
-                                container=ctx.obj['output']),
-                                name="datasink")
+    ctx.obj['n_procs'] = n_procs
+    ctx.obj['plugin'] = plugin
+    if not nthreads:
+        if plugin in ('Linear', 'MultiProc'):
+            nthreads = n_procs
+        else:
+            nthreads = 1
+    ctx.obj['nthreads'] = nthreads
     if not name:
         name = 'meta'
-    wf = pe.Workflow(name=name, base_dir=ctx.obj['wdir'])
-    wf.add_nodes([datasink])
-    ctx.obj['workflow'] = wf
-    ctx.obj['results'] = datasink
+    ctx.obj['name'] = name
+
+
+def get_workflow(ctx):
+    """Returns the meta workflow, creating it on first use.
+
+    Nipype is imported here rather than at module level so that
+    the help and argument errors do not pay its import cost."""
+
+    if 'workflow' not in ctx.obj:
+        from nipype import config
+        from .engine import CachedWorkflow
+        config.update_config({'execution': {
+            'use_relative_paths': 'true',
+            # nipype defaults, pinned only to override a site nipype.cfg
+            'hash_method': 'timestamp',
+            'stop_on_first_crash': 'false',
+            'remove_unnecessary_outputs': 'true',
+            'keep_inputs': 'false',
+            'try_hard_link_datasink': 'true'}})
+        wf = CachedWorkflow(name=ctx.obj['name'], base_dir=ctx.obj['wdir'])
+        ctx.obj['workflow'] = wf
+    return ctx.obj['workflow']
+
+
+def get_datasink(ctx):
+    """Returns the results datasink.
+
+    The datasink is added to the meta workflow on first use."""
+
+    if 'results' not in ctx.obj:
+        import nipype.pipeline.engine as pe
+        from nipype.interfaces.io import DataSink
+        datasink = pe.Node(DataSink(base_directory=ctx.obj['wdir'],
+                                    container=ctx.obj['output']),
+                           name="datasink")
+        get_workflow(ctx).add_nodes([datasink])
+        ctx.obj['results'] = datasink
+    return ctx.obj['results']
+
+
+def set_nthreads(ctx, wf_sub):
+    """Sets the number of threads of the multithreaded nodes in a workflow.
+
+    The nodes also reserve as many processes from the scheduler
+    (or request as many CPUs per job on SLURM and SGE),
+    so that concurrent nodes do not oversubscribe the cores."""
+
+    nthreads = ctx.obj['nthreads']
+    for node_name in wf_sub.list_node_names():
+        node = wf_sub.get_node(node_name)
+        if hasattr(node.inputs, 'nthreads'):
+            node.inputs.nthreads = nthreads
+            node.n_procs = nthreads
+            if nthreads > 1 and ctx.obj['plugin'] == 'SLURM':
+                node.plugin_args['sbatch_args'] = \
+                    '--cpus-per-task=%d' % nthreads
+            elif nthreads > 1 and ctx.obj['plugin'] == 'SGE':
+                node.plugin_args['qsub_args'] = '-pe smp %d' % nthreads
 
 
 @cli.command('recon')
@@ -62,15 +134,16 @@ def dw_recon(ctx, workflow, in_file, bvec, bval, anat, opt):
     except ImportError as err:
         click.echo(workflow + ' is not a valid workflow.')
         sys.exit(1)
-    wf = ctx.obj['workflow']
+    wf = get_workflow(ctx)
     wf_sub = wf_mod.create_pipeline(name='recon', opt=opt)
+    set_nthreads(ctx, wf_sub)
     wf_sub.inputs.inputnode.dwi = click.format_filename(in_file)
     wf_sub.inputs.inputnode.bvecs = click.format_filename(bvec)
     wf_sub.inputs.inputnode.bvals = click.format_filename(bval)
     if anat:
         wf_sub.inputs.inputnode.t1_dw = click.format_filename(anat)
     wf.add_nodes([wf_sub])
-    wf.connect([(wf_sub, ctx.obj['results'], [
+    wf.connect([(wf_sub, get_datasink(ctx), [
         ("outputnode.odf", "@odf"),
         ("outputnode.seed", "@seed")])])
     ctx.obj['recon'] = wf_sub
@@ -104,6 +177,8 @@ def odf_track(ctx, workflow, odf, seed, algorithm, angle, angle_range, min_lengt
     except ImportError as err:
         click.echo(workflow + ' is not a valid workflow.')
         sys.exit(1)
+    import nipype.pipeline.engine as pe
+    from nipype.interfaces import utility as util
     param = pe.Node(
         interface=util.IdentityInterface(fields=["angle", "algorithm", "min_length"]),
         name="param_node")
@@ -124,10 +199,11 @@ def odf_track(ctx, workflow, odf, seed, algorithm, angle, angle_range, min_lengt
         param_dict['min_length'] = [int(l) for l in lengths if l.isdigit()]
         param.iterables.append(('min_length', param_dict['min_length']))
     wf_sub = wf_mod.create_pipeline(name='tck', opt=opt, ensemble=ensemble)
+    set_nthreads(ctx, wf_sub)
     if ensemble:
         param.iterables.remove((ensemble, param_dict[ensemble]))
         setattr(wf_sub.inputs.inputnode, ensemble, param_dict[ensemble])
-    wf = ctx.obj['workflow']
+    wf = get_workflow(ctx)
     if seed:
         wf_sub.inputs.inputnode.seed = click.format_filename(seed)
     if 'recon' not in ctx.obj:
@@ -141,7 +217,7 @@ def odf_track(ctx, workflow, odf, seed, algorithm, angle, angle_range, min_lengt
     if param.iterables:
         for p in param.iterables:
             wf.connect([(param, wf_sub, [(p[0], "inputnode." + p[0])])])
-    wf.connect([(wf_sub, ctx.obj['results'], [("outputnode.tck", "@tck")])])
+    wf.connect([(wf_sub, get_datasink(ctx), [("outputnode.tck", "@tck")])])
     ctx.obj['track'] = wf_sub
     ctx.obj['param'] = param
     return workflow
@@ -152,13 +228,14 @@ def odf_track(ctx, workflow, odf, seed, algorithm, angle, angle_range, min_lengt
 @click.option('-t', '--tck', type=click.Path(exists=True, resolve_path=True),
               help='Reconstructed streamlines.')
 @click.option('-o', '--odf', type=click.Path(exists=True, resolve_path=True),
-              help='Estimated fiber orientation distribution.')
+              help='Estimated fiber orientation distribution '
+                   '(only required by mrtrix_tcksift).')
 @click.option('--opt', type=str, help='Workflow-specific optional arguments.')
 @click.pass_context
 def tck_filter(ctx, workflow, tck, odf, opt):
     """Filters the tracking result.
 
-    Available workflows: mrtrix_tcksift"""
+    Available workflows: mrtrix_tcksift, mrtrix_tckedit"""
 
     try:
         wf_mod = import_module('.workflows.' + workflow, package='trampolino')
@@ -168,21 +245,24 @@ def tck_filter(ctx, workflow, tck, odf, opt):
         click.echo(workflow + ' is not a valid workflow.')
         sys.exit(1)
     wf_sub = wf_mod.create_pipeline(name='tck_post', opt=opt)
-    wf = ctx.obj['workflow']
+    set_nthreads(ctx, wf_sub)
+    wf = get_workflow(ctx)
     if 'track' not in ctx.obj:
         wf_sub.inputs.inputnode.tck = click.format_filename(tck)
-        wf_sub.inputs.inputnode.odf = click.format_filename(odf)
+        if odf:
+            wf_sub.inputs.inputnode.odf = click.format_filename(odf)
         wf.add_nodes([wf_sub])
     else:
         wf.add_nodes([wf_sub])
         wf.connect([(ctx.obj['track'], wf_sub, [("outputnode.tck", "inputnode.tck")]),
                     (ctx.obj['track'], wf_sub, [("inputnode.odf", "inputnode.odf")])])
-    wf.connect([(wf_sub, ctx.obj['results'], [("outputnode.tck_post", "@tck_post")])])
+    wf.connect([(wf_sub, get_datasink(ctx), [("outputnode.tck_post", "@tck_post")])])
     return workflow
 
 
 @cli.resultcallback()
-def process_result(steps, working_dir, name, results):
+def process_result(steps, working_dir, name, results, plugin, n_procs, mem_gb,
+                   plugin_args, nthreads):
     for n, s in enumerate(steps):
         click.echo('Step {}: {}'.format(n + 1, s))
     ctx = click.get_current_context()
@@ -190,7 +270,16 @@ def process_result(steps, working_dir, name, results):
     wf.write_graph(graph2use='colored')
     click.echo('Workflow graph generated.')
     click.echo('Workflow about to be executed. Fasten your seatbelt!')
-    wf.run()
+    args = {}
+    if plugin == 'MultiProc':
+        args = {'n_procs': n_procs, 'raise_insufficient': False}
+        if mem_gb:
+            args['memory_gb'] = mem_gb
+    elif plugin == 'SLURM' and plugin_args:
+        args = {'sbatch_args': plugin_args}
+    elif plugin == 'SGE' and plugin_args:
+        args = {'qsub_args': plugin_args}
+    wf.run(plugin=plugin, plugin_args=args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""Workflow engine helpers."""
+import nipype.pipeline.engine as pe
+
+
+class CachedWorkflow(pe.Workflow):
+    """Workflow with constant-time node membership checks.
+
+    Nipype's ``_has_node`` scans every node (and every nested workflow)
+    for each endpoint of each connection. Here direct members are looked up
+    in the underlying graph and only the nested workflows are searched.
+    """
+
+    def __init__(self, name, base_dir=None):
+        super(CachedWorkflow, self).__init__(name, base_dir)
+        self._nested_wfs = set()
+
+    def _track_nested(self, nodes):
+        self._nested_wfs.update(n for n in nodes if isinstance(n, pe.Workflow))
+
+    def add_nodes(self, nodes):
+        super(CachedWorkflow, self).add_nodes(nodes)
+        self._track_nested(nodes)
+
+    def remove_nodes(self, nodes):
+        super(CachedWorkflow, self).remove_nodes(nodes)
+        self._nested_wfs.difference_update(nodes)
+
+    def connect(self, *args, **kwargs):
+        super(CachedWorkflow, self).connect(*args, **kwargs)
+        if len(args) == 1:
+            connection_list = args[0]
+        elif len(args) == 4:
+            connection_list = [(args[0], args[2], None)]
+        else:
+            return
+        for srcnode, destnode, _ in connection_list:
+            self._track_nested([srcnode, destnode])
+
+    def _has_node(self, wanted_node):
+        if wanted_node in self._graph:
+            return True
+        # nipype may drop nested workflows straight from the graph
+        # (e.g. when flattening), so forget the ones that are gone
+        self._nested_wfs = set(wf for wf in self._nested_wfs
+                               if wf in self._graph)
+        for wf in self._nested_wfs:
+            if wf._has_node(wanted_node):
+                return True
+        return False
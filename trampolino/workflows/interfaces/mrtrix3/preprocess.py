@@ -7,7 +7,7 @@ from __future__ import (print_function, division, unicode_literals,
 import os.path as op
 
 from nipype.interfaces.base import (CommandLineInputSpec, CommandLine, traits, TraitedSpec,
-                    File, isdefined, Undefined, InputMultiObject)
+                    File, isdefined, InputMultiObject)
 from .base import MRTrix3BaseInputSpec, MRTrix3Base
 
 
@@ -300,9 +300,9 @@ class ResponseSD(MRTrix3Base):
     def _list_outputs(self):
         outputs = self.output_spec().get()
         outputs['wm_file'] = op.abspath(self.inputs.wm_file)
-        if self.inputs.gm_file != Undefined:
+        if isdefined(self.inputs.gm_file):
             outputs['gm_file'] = op.abspath(self.inputs.gm_file)
-        if self.inputs.csf_file != Undefined:
+        if isdefined(self.inputs.csf_file):
             outputs['csf_file'] = op.abspath(self.inputs.csf_file)
         return outputs
 
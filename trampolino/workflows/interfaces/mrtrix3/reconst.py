@@ -6,7 +6,7 @@ from __future__ import (print_function, division, unicode_literals,
 
 import os.path as op
 
-from nipype.interfaces.base import traits, TraitedSpec, File, Undefined, InputMultiObject
+from nipype.interfaces.base import traits, TraitedSpec, File, isdefined, InputMultiObject
 from .base import MRTrix3BaseInputSpec, MRTrix3Base
 
 
@@ -160,8 +160,8 @@ class EstimateFOD(MRTrix3Base):
     def _list_outputs(self):
         outputs = self.output_spec().get()
         outputs['wm_odf'] = op.abspath(self.inputs.wm_odf)
-        if self.inputs.gm_odf != Undefined:
+        if isdefined(self.inputs.gm_odf):
             outputs['gm_odf'] = op.abspath(self.inputs.gm_odf)
-        if self.inputs.csf_odf != Undefined:
+        if isdefined(self.inputs.csf_odf):
             outputs['csf_odf'] = op.abspath(self.inputs.csf_odf)
         return outputs
@@ -348,6 +348,29 @@ class TckEditInputSpec(MRTrix3BaseInputSpec):
         usedefault=True,
         desc='output edited track file')
 
+    # Streamline criteria options
+    roi_incl = File(
+        exists=True,
+        argstr='-include %s',
+        desc=('specify an inclusion region of interest, streamlines must'
+              ' traverse ALL inclusion regions to be accepted'))
+    roi_excl = File(
+        exists=True,
+        argstr='-exclude %s',
+        desc=('specify an exclusion region of interest, streamlines that'
+              ' enter ANY exclude region will be discarded'))
+    roi_mask = File(
+        exists=True,
+        argstr='-mask %s',
+        desc=('specify a masking region of interest. If defined,'
+              ' streamlines exiting the mask will be truncated'))
+    max_length = traits.Float(
+        argstr='-maxlength %f',
+        desc='set the maximum length of any streamline in mm')
+    min_length = traits.Float(
+        argstr='-minlength %f',
+        desc='set the minimum length of any streamline in mm')
+
 
 class TckEditOutputSpec(TraitedSpec):
     out_file = File(exists=True, desc='the output edited tracks')
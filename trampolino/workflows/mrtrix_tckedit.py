@@ -0,0 +1,64 @@
+from nipype.interfaces import utility as util
+from nipype.pipeline import engine as pe
+from .interfaces import mrtrix3 as mrtrix3
+import os.path
+
+
+def create_pipeline(name="tckedit", opt=""):
+
+    parameters = {'min_length': None,
+                  'max_length': None,
+                  'include': None,
+                  'exclude': None,
+                  'mask': None}
+
+    inputnode = pe.Node(
+        interface=util.IdentityInterface(fields=["tck", "odf"]),
+        name="inputnode")
+
+    if opt is not None:
+        opt_list = opt.split(',')
+        for o in opt_list:
+            try:
+                [key, value] = o.split(':')
+                parameters[key] = value
+            except ValueError:
+                print(o+': irregular format, skipping')
+
+    tckedit = pe.Node(mrtrix3.TckEdit(), name='edit')
+    tckedit.inputs.out_file = 'tracked_filtered.tck'
+    if parameters['min_length'] is not None:
+        tckedit.inputs.min_length = float(parameters['min_length'])
+
+    if parameters['max_length'] is not None:
+        tckedit.inputs.max_length = float(parameters['max_length'])
+
+    if parameters['include'] is not None:
+        tckedit.inputs.roi_incl = os.path.abspath(parameters['include'])
+
+    if parameters['exclude'] is not None:
+        tckedit.inputs.roi_excl = os.path.abspath(parameters['exclude'])
+
+    if parameters['mask'] is not None:
+        tckedit.inputs.roi_mask = os.path.abspath(parameters['mask'])
+
+    output_fields = ["tck_post"]
+    outputnode = pe.Node(
+        interface=util.IdentityInterface(fields=output_fields),
+        name="outputnode")
+
+    workflow = pe.Workflow(name=name)
+    workflow.base_output_dir = name
+
+    workflow.connect([(inputnode, tckedit, [(("tck", to_list), "in_files")])])
+
+    workflow.connect([
+        (tckedit, outputnode, [("out_file", "tck_post")])
+    ])
+
+    return workflow
+
+
+def to_list(in_file):
+
+    return [in_file]